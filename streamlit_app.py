@@ -1,27 +1,28 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import json
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import altair as alt
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from google.oauth2.service_account import Credentials
 
 # ---- Configuration ----
 SHEET_NAME = "Perfect Day Log"
 META_SHEET_NAME = "Meta"
 OBJ_SHEET_NAME = "Objectives"
+ACH_SHEET_NAME = "Achievements"
 THEME_COLOR = "#1DB954"
 BG_COLOR = '#121212'
 TEXT_COLOR = '#FFFFFF'
 GRID_COLOR = '#333333'
 
 # ---- Google Sheets Setup ----
+@st.cache_resource
 def get_gsheet_client():
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds_json = st.secrets['gcp_service_account']
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_json, scope)
+    scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+    creds = Credentials.from_service_account_info(dict(st.secrets['gcp_service_account']), scopes=scopes)
     return gspread.authorize(creds)
 
 # ---- Ensure Worksheet ----
@@ -34,83 +35,139 @@ def ensure_ws(spreadsheet, title, headers):
     return ws
 
 # ---- Load Sheets ----
-def load_sheets():
+@st.cache_resource
+def get_worksheets():
     client = get_gsheet_client()
     try:
         spreadsheet = client.open(SHEET_NAME)
     except gspread.exceptions.SpreadsheetNotFound:
         spreadsheet = client.create(SHEET_NAME)
-    # Objectives sheet
     obj_ws = ensure_ws(spreadsheet, OBJ_SHEET_NAME, ['Objective', 'Weight'])
-    obj_records = obj_ws.get_all_records()
-    tasks = {r['Objective']: int(r['Weight']) for r in obj_records}
-    # Data sheet
     sheet = spreadsheet.sheet1
+    meta = ensure_ws(spreadsheet, META_SHEET_NAME, ['Streak'])
+    ach_ws = ensure_ws(spreadsheet, ACH_SHEET_NAME, ['Achievement', 'Unlocked'])
+    return spreadsheet, sheet, meta, ach_ws
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_values(_spreadsheet, sheet_id, data_title):
+    ranges = [f'{OBJ_SHEET_NAME}!A:B', f'{data_title}!A:Z', f'{ACH_SHEET_NAME}!A:B']
+    resp = _spreadsheet.values_batch_get(ranges=ranges)['valueRanges']
+    return tuple(vr.get('values', []) for vr in resp)
+
+def build_dataframe(values, headers):
+    if len(values) < 2 or 'Date' not in values[0]:
+        df = pd.DataFrame(columns=list(headers))
+    else:
+        df = pd.DataFrame(values[1:], columns=values[0])
+        casts = {c: np.int8 for c in df.columns if c not in ('Date', 'Score')}
+        if 'Score' in df.columns: casts['Score'] = np.int16
+        df = df.astype(casts, errors='ignore')
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce', cache=True)
+    return df
+
+def load_sheets():
+    spreadsheet, sheet, meta, ach_ws = get_worksheets()
+    # One batched GET covers objectives, the data sheet and achievements
+    obj_vals, data_vals, ach_vals = load_values(spreadsheet, spreadsheet.id, sheet.title)
+    tasks = {r[0]: int(r[1]) for r in obj_vals[1:] if len(r) > 1}
     headers = ['Date'] + list(tasks.keys()) + ['Score']
-    if sheet.row_values(1) != headers:
+    if not data_vals or data_vals[0] != headers:
         sheet.clear(); sheet.append_row(headers)
-    df = pd.DataFrame(sheet.get_all_records())
-    if df.empty or 'Date' not in df.columns:
-        df = pd.DataFrame(columns=headers)
-    # Meta sheet
-    meta = ensure_ws(spreadsheet, META_SHEET_NAME, ['Streak'])
-    return tasks, df, sheet, meta
+        data_vals = [headers]; load_values.clear()
+    df = build_dataframe(data_vals, headers)
+    dates = df['Date'].dropna().unique()
+    st.session_state.streak = get_current_streak(dates, np.datetime64(datetime.now().date()))
+    if 'achievements' not in st.session_state:
+        st.session_state.achievements = {r[0]: (r[1] if len(r) > 1 else '') for r in ach_vals[1:] if r}
+    return tasks, df, sheet, meta, ach_ws
 
 # ---- Streak ----
-def has_n_day_streak(df, n):
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    dates = set(df['Date'].dt.normalize().dropna())
-    today = pd.to_datetime(datetime.now().strftime('%Y-%m-%d'))
-    return all((today - pd.Timedelta(days=i)) in dates for i in range(n))
+def has_n_day_streak(dates, n, today64):
+    req = today64 - np.arange(n).astype('timedelta64[D]')
+    return bool(np.isin(req, dates).all())
 
-def get_current_streak(df):
-    if df.empty: return 0
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    dates = sorted(set(df['Date'].dt.normalize().dropna()), reverse=True)
-    streak = 0; today = pd.to_datetime(datetime.now().strftime('%Y-%m-%d'))
-    for i, d in enumerate(dates):
-        if today - pd.Timedelta(days=i) == d: streak += 1
-        else: break
-    return streak
+def get_current_streak(dates, today64):
+    if not len(dates): return 0
+    dates = np.sort(dates)[::-1]
+    gaps = (today64 - dates).astype('timedelta64[D]').astype(int)
+    misses = gaps != np.arange(len(gaps))
+    return int(np.argmax(misses)) if misses.any() else len(gaps)
+
+# ---- Achievements ----
+def check_achievements(score, achievements, dates, today64, date):
+    checks = (('First 50%', lambda: score >= 50),
+              ('First 100%', lambda: score == 100),
+              ('Three Days Streak', lambda: has_n_day_streak(dates, 3, today64)))
+    return [[name, date] for name, cond in checks if name not in achievements and cond()]
 
 # ---- Plotting ----
 def plot_score(df):
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    df = df.sort_values('Date')
-    fig, ax = plt.subplots(facecolor=BG_COLOR); ax.set_facecolor(BG_COLOR)
-    ax.plot(df['Date'], df['Score'], marker='o', color=THEME_COLOR)
-    if not df.empty:
-        ax.set_xlim(df['Date'].min()-pd.Timedelta(days=1), df['Date'].max()+pd.Timedelta(days=1))
-    ax.set_ylim(0, 100)
-    ax.xaxis.set_major_locator(mdates.DayLocator()); ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
-    fig.autofmt_xdate(); ax.set_title('Score Over Time', color=THEME_COLOR)
-    ax.set_xlabel('Date', color=TEXT_COLOR); ax.set_ylabel('Score', color=TEXT_COLOR)
-    ax.tick_params(colors=TEXT_COLOR); ax.grid(True, color=GRID_COLOR)
-    return fig
+    # Rows are appended in date order and Vega-Lite orders line points by x,
+    # so no per-render sort is needed.
+    chart = alt.Chart(df).mark_line(point=True, color=THEME_COLOR).encode(
+        x=alt.X('Date:T', title='Date', axis=alt.Axis(format='%b %d')),
+        y=alt.Y('Score:Q', title='Score', scale=alt.Scale(domain=[0, 100])))
+    return chart.properties(title='Score Over Time', background=BG_COLOR).configure_axis(
+        labelColor=TEXT_COLOR, titleColor=TEXT_COLOR, gridColor=GRID_COLOR).configure_title(color=THEME_COLOR)
 
 # ---- App ----
 st.set_page_config(page_title='Perfect Day Tracker', layout='wide')
 st.markdown(f"<style>body{{background-color:{BG_COLOR};color:{TEXT_COLOR}}}</style>", unsafe_allow_html=True)
 st.title('🌟 My Perfect Day Tracker')
 
-tasks, df_all, sheet, meta = load_sheets()
+tasks, df_all, sheet, meta, ach_ws = load_sheets()
 names = list(tasks.keys())
-cols = st.columns([1,2], gap='large')
-with cols[0]:
+weights = np.fromiter(tasks.values(), dtype=np.int16)
+labels = [f"{t} ({w}%)" for t, w in tasks.items()]
+@st.fragment
+def checklist_panel(df_all, tasks, sheet):
     st.subheader('📝 Daily Checklist')
     with st.form('f'):
-        entry = {t: st.checkbox(f"{t} ({tasks[t]}%)") for t in names}
+        entry = [st.checkbox(labels[i], key=f'cb_{i}') for i in range(len(names))]
         if st.form_submit_button('✅ Submit Day'):
-            date = datetime.now().strftime('%Y-%m-%d')
-            row = [date] + [int(entry[t]) for t in names] + [sum(tasks[t] for t,done in entry.items() if done)]
-            if date in df_all['Date'].astype(str).tolist(): df_all.loc[df_all['Date'].astype(str)==date] = row
-            else: df_all.loc[len(df_all)] = row
-            sheet.clear(); sheet.append_row(['Date']+names+['Score']); sheet.append_rows(df_all.values.tolist())
-            streak = get_current_streak(df_all)
-            meta.clear(); meta.append_row(['Streak']); meta.append_row([streak])
-            st.success(f"Your Score: {row[-1]}%")
-    cs = meta.cell(2,1).value or '0'
+            # Guard against a double-click firing two write flows at once
+            if st.session_state.get('in_flight'): st.stop()
+            st.session_state.in_flight = True
+            try:
+                today = pd.Timestamp.now().normalize()
+                date = today.strftime('%Y-%m-%d')
+                flags = np.fromiter(entry, dtype=np.int8)
+                row = [date] + flags.tolist() + [int(weights @ flags)]
+                data = []
+                hit = np.flatnonzero(df_all['Date'].values == today.to_datetime64())
+                if hit.size:
+                    row_idx = int(hit[0])
+                    df_all.iloc[row_idx] = [today] + row[1:]
+                else:
+                    row_idx = len(df_all)
+                    df_all.loc[row_idx] = [today] + row[1:]
+                data.append({'range': f'{sheet.title}!A{row_idx+2}', 'values': [row]})
+                dates = df_all['Date'].dropna().unique()
+                streak = get_current_streak(dates, today.to_datetime64())
+                st.session_state.streak = int(streak)
+                data.append({'range': f'{META_SHEET_NAME}!A1:A2', 'values': [['Streak'], [int(streak)]]})
+                pending = check_achievements(row[-1], st.session_state.achievements, dates, today.to_datetime64(), date)
+                if pending:
+                    data.append({'range': f'{ACH_SHEET_NAME}!A{len(st.session_state.achievements)+2}', 'values': pending})
+                    for n, d in pending: st.session_state.achievements[n] = d
+                sheet.spreadsheet.values_batch_update({'valueInputOption': 'USER_ENTERED', 'data': data})
+                load_values.clear()
+                st.session_state['last_score'] = row[-1]
+            finally:
+                st.session_state.in_flight = False
+            st.rerun(scope='app')
+    if 'last_score' in st.session_state:
+        st.success(f"Your Score: {st.session_state.pop('last_score')}%")
+    cs = str(st.session_state.streak)
     st.markdown(f"<p style='font-size:24px;color:{THEME_COLOR}'>🔥 Current Streak: {cs} day{'s' if cs!='1' else ''}</p>", unsafe_allow_html=True)
+    if st.session_state.achievements:
+        st.subheader('🏆 Achievements')
+        ach_df = pd.DataFrame(st.session_state.achievements.items(), columns=['Achievement', 'Unlocked'])
+        st.dataframe(ach_df, hide_index=True)
+
+cols = st.columns([1,2], gap='large')
+with cols[0]:
+    checklist_panel(df_all, tasks, sheet)
 
 with cols[1]:
-    if not df_all.empty: st.subheader('📈 Score Over Time'); st.pyplot(plot_score(df_all))
+    if not df_all.empty: st.subheader('📈 Score Over Time'); st.altair_chart(plot_score(df_all), use_container_width=True)